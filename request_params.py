@@ -1,8 +1,10 @@
-from dataclasses import dataclass, fields
-from typing import Any
+from dataclasses import Field, dataclass, fields, is_dataclass
+from enum import Enum
+from itertools import islice
+from typing import Any, get_args
 
 
-@dataclass
+@dataclass(slots=True)
 class PaymentRequestParams:
     token: str
     refId: str
@@ -14,26 +16,82 @@ class PaymentRequestParams:
     forceTransactionType: str | None = None
     confId: int | None = None
 
-    def __get(self, field: str) -> Any:
-        val = getattr(self, field)
-        if type(val) is bool:
-            return "Y" if val is True else "N"
-        return val
-
     def to_dict(self) -> dict:
         """
         Converts this dataclass to a dict.
-        'None' params are excluded. Boolean values are replaced: True->Y / False->N
+        'None' params are excluded. Values of bool-annotated fields are replaced: True->Y / False->N
+        Nested params objects (also inside lists and dicts) are converted as well
         """
-        return dict((field.name, self.__get(field.name))
-                    for field in fields(self) if getattr(self, field.name) is not None)
+        ...  # replaced by _compile_to_dict() below
+
 
+_SCALAR_TYPES = (str, int, float, bool, type(None))
 
-@dataclass(frozen=True)
-class TransactionType:
+
+def _flatten(val: Any) -> Any:
+    """
+    Converts nested params objects, returning containers unchanged when nothing in them needs converting
+    """
+    if isinstance(val, list):
+        for i, item in enumerate(val):
+            if (new := _flatten(item)) is not item:
+                return [*val[:i], new, *(_flatten(rest) for rest in val[i + 1:])]
+        return val
+    if isinstance(val, dict):
+        for i, (key, item) in enumerate(val.items()):
+            if (new := _flatten(item)) is not item:
+                result = dict(islice(val.items(), i))
+                result[key] = new
+                result.update((k, _flatten(v)) for k, v in islice(val.items(), i + 1, None))
+                return result
+        return val
+    if is_dataclass(val) and not isinstance(val, type) and hasattr(val, "to_dict"):
+        return val.to_dict()
+    return val
+
+
+def _is_bool_field(field: Field) -> bool:
+    return field.type is bool or bool in get_args(field.type)
+
+
+def _is_scalar_field(field: Field) -> bool:
+    return all(arg in _SCALAR_TYPES for arg in get_args(field.type) or (field.type,))
+
+
+def _compile_to_dict(cls: type) -> None:
+    """
+    Replaces the declared cls.to_dict with straight-line code specialized for the fields of cls
+    """
+    lines = ["def to_dict(self):", "    d = {}"]
+    for field in fields(cls):
+        lines.append(f"    v = self.{field.name}")
+        if _is_bool_field(field):
+            lines.append(f"    if v is True: d[{field.name!r}] = 'Y'")
+            lines.append(f"    elif v is False: d[{field.name!r}] = 'N'")
+            lines.append(f"    elif v is not None: d[{field.name!r}] = v")
+        elif _is_scalar_field(field):
+            lines.append(f"    if v is not None: d[{field.name!r}] = v")
+        else:
+            lines.append(f"    if v is not None: d[{field.name!r}] = _flatten(v)")
+    lines.append("    return d")
+    namespace = {"_flatten": _flatten}
+    exec("\n".join(lines), namespace)
+    to_dict = namespace["to_dict"]
+    to_dict.__doc__ = cls.to_dict.__doc__
+    to_dict.__qualname__ = f"{cls.__qualname__}.to_dict"
+    cls.to_dict = to_dict
+
+
+_compile_to_dict(PaymentRequestParams)
+
+
+class TransactionType(str, Enum):
     """
     TransactionType.A - Authorize only
     TransactionType.S - Sale (Auth & Capture)
     """
     A = "A"
     S = "S"
+
+    __str__ = str.__str__
+    __format__ = str.__format__
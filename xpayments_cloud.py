@@ -1,14 +1,29 @@
-from requests import post
+from concurrent.futures import ThreadPoolExecutor
+from os import environ
+from requests import Session
+from requests.adapters import HTTPAdapter
 from requests.exceptions import RequestException, HTTPError
-from json import JSONDecodeError, dumps as json_dumps
+from json import JSONDecodeError
 from base64 import b64encode
-from hmac import new as hmac_new
-from hashlib import sha256
+from hmac import digest as hmac_digest
 from exceptions import IllegalArgumentError, JSONProcessingError, UnicodeProcessingError
 from request_params import PaymentRequestParams
-from dotenv import dotenv_values
 
-config = dotenv_values(".env")
+try:
+    from orjson import OPT_NON_STR_KEYS, dumps as _orjson_dumps
+
+    def json_dumps(obj: dict) -> bytes:
+        return _orjson_dumps(obj, option=OPT_NON_STR_KEYS)
+except ImportError:
+    from json import dumps as _json_dumps
+
+    def json_dumps(obj: dict) -> bytes:
+        return _json_dumps(obj).encode()
+
+_ACTION_BYTES = {action: action.encode() for action in (
+    'pay', 'tokenize_card', 'rebill', 'capture', 'void', 'refund', 'continue', 'accept', 'decline',
+    'get_info', 'get_cards', 'add', 'start', 'stop', 'get', 'delete',
+)}
 
 
 class Request:
@@ -17,20 +32,51 @@ class Request:
     TEST_SERVER_HOST: str
     API_VERSION = "4.8"
     CONNECTION_TIMEOUT = 120
+    POOL_CONNECTIONS = 1
+    POOL_MAXSIZE = 16
     account: str
     api_key: str
     secret_key: str
+    _session: Session
+    _auth_header: str
+    _hmac_key: bytes
+    _server_host: str
+    _base_url: str
 
     def __init__(self, account: str, api_key: str, secret_key: str) -> None:
         """
         Request constructor
         """
-        if not all([len(str(v)) > 0 for v in locals().values() if type(v) is not Request]):
+        if not account or not api_key or not secret_key:
             raise IllegalArgumentError
         self.account = str(account)
         self.api_key = str(api_key)
         self.secret_key = str(secret_key)
-        self.TEST_SERVER_HOST = config.get('TEST_SERVER_HOST', '')
+        self.TEST_SERVER_HOST = environ.get('TEST_SERVER_HOST', '')
+        self._auth_header = f"Basic {self.get_authorization_header()}"
+        try:
+            self._hmac_key = self.secret_key.encode()
+        except UnicodeEncodeError:
+            raise UnicodeProcessingError
+        self._server_host = self.TEST_SERVER_HOST if len(self.TEST_SERVER_HOST) > 0 \
+            else f"{self.account}.{self.XP_DOMAIN}"
+        self._base_url = f"https://{self._server_host}/api/{self.API_VERSION}"
+        self._session = Session()
+        self._session.mount("https://", HTTPAdapter(pool_connections=self.POOL_CONNECTIONS,
+                                                    pool_maxsize=self.POOL_MAXSIZE))
+        self._session.headers["Content-Type"] = "application/json"
+
+    def __enter__(self) -> "Request":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the underlying HTTP session
+        """
+        self._session.close()
 
     def send(self, controller: str, action: str, request_data: dict) -> str:
         """
@@ -39,17 +85,15 @@ class Request:
         request = json_dumps(request_data)
         url = self.get_api_endpoint(action=action, controller=controller)
         headers = {
-            "Authorization": f"Basic {self.get_authorization_header()}",
+            "Authorization": self._auth_header,
             "X-Payments-Signature": self.get_signature_header(action=action, data=request),
-            "Content-Type": "application/json",
         }
         try:
-            response = post(url=url, data=request, headers=headers, timeout=self.CONNECTION_TIMEOUT)
+            response = self._session.post(url=url, data=request, headers=headers, timeout=self.CONNECTION_TIMEOUT)
         except RequestException:
             raise HTTPError
         response.raise_for_status()
         try:
-            # print(response.json())
             return response.json()
         except JSONDecodeError as ex:
             raise JSONProcessingError(ex.msg)
@@ -64,13 +108,15 @@ class Request:
         except UnicodeEncodeError | UnicodeDecodeError:
             raise UnicodeProcessingError
 
-    def get_signature_header(self, action: str, data: str) -> str:
+    def get_signature_header(self, action: str, data: bytes | str) -> str:
         """
         Get signature header
         """
         try:
-            message = f"{action}{data}".encode()
-            return hmac_new(key=self.secret_key.encode(), msg=message, digestmod=sha256).hexdigest()
+            if isinstance(data, str):
+                data = data.encode()
+            action_bytes = _ACTION_BYTES.get(action) or action.encode()
+            return hmac_digest(self._hmac_key, action_bytes + data, "sha256").hex()
         except UnicodeEncodeError:
             raise UnicodeProcessingError
 
@@ -78,18 +124,18 @@ class Request:
         """
         Get X-Payments server host
         """
-        return self.TEST_SERVER_HOST if len(self.TEST_SERVER_HOST) > 0 \
-            else f"{self.account}.{self.XP_DOMAIN}"
+        return self._server_host
 
     def get_api_endpoint(self, action: str, controller: str) -> str:
         """
         Get API endpoint
         """
-        return f"https://{self.get_server_host()}/api/{self.API_VERSION}/{controller}/{action}"
+        return f"{self._base_url}/{controller}/{action}"
 
 
 class Client:
 
+    MAX_WORKERS = 16
     account: str
     api_key: str
     secret_key: str
@@ -99,13 +145,25 @@ class Client:
         """
         Client constructor
         """
-        if not all([len(str(v)) > 0 for v in locals().values() if type(v) is not Client]):
+        if not account or not api_key or not secret_key:
             raise IllegalArgumentError
         self.account = str(account)
         self.api_key = str(api_key)
         self.secret_key = str(secret_key)
         self.request = Request(account=self.account, api_key=self.api_key, secret_key=self.secret_key)
 
+    def __enter__(self) -> "Client":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the underlying HTTP session
+        """
+        self.request.close()
+
     def do_pay(self, params: PaymentRequestParams) -> str:
         """
         Process payment
@@ -135,9 +193,10 @@ class Client:
         """
         Execute secondary payment action
         """
-        params = {"xpid": xpid}
         if amount is not None and amount > 0:
-            params.amount = amount
+            params = {"xpid": xpid, "amount": amount}
+        else:
+            params = {"xpid": xpid}
         return self.request.send(controller='payment', action=action, request_data=params)
 
     def do_capture(self, xpid: str, amount: int) -> str:
@@ -182,6 +241,42 @@ class Client:
         """
         return self.do_action(action='get_info', xpid=xpid)
 
+    def do_concurrent_requests(self, controller: str, action: str,
+                               requests_data: dict[str, dict]) -> dict[str, str | Exception]:
+        """
+        Send several API requests concurrently.
+        requests_data maps a caller-chosen key to the request data; the result maps the same keys to the
+        response or the raised exception, so one failure never hides the outcome of the other requests.
+        All workers share this client's Session: its urllib3 connection pool is thread-safe and the SDK
+        does not rely on the Session's cookie jar.
+        """
+        if not requests_data:
+            return {}
+        results = {}
+        with ThreadPoolExecutor(max_workers=min(len(requests_data), self.MAX_WORKERS)) as executor:
+            futures = [(key, executor.submit(self.request.send, controller=controller, action=action,
+                                             request_data=request_data))
+                       for key, request_data in requests_data.items()]
+            for key, future in futures:
+                try:
+                    results[key] = future.result()
+                except Exception as ex:
+                    results[key] = ex
+        return results
+
+    def do_concurrent_action(self, action: str, xpids: list[str]) -> dict[str, str | Exception]:
+        """
+        Execute secondary payment action for several payments concurrently
+        """
+        return self.do_concurrent_requests(controller='payment', action=action,
+                                           requests_data={xpid: {"xpid": xpid} for xpid in xpids})
+
+    def do_bulk_capture(self, xpids: list[str]) -> dict[str, str | Exception]:
+        """
+        Capture several payments (full amount) concurrently
+        """
+        return self.do_concurrent_action(action='capture', xpids=xpids)
+
     def do_get_customer_cards(self, customer_id: str, status: str = 'any') -> str:
         """
         Get customer's cards
@@ -230,6 +325,13 @@ class Client:
         params = {"batch_id": batch_id}
         return self.request.send(controller='bulk_operation', action='delete', request_data=params)
 
+    def do_concurrent_bulk_operation(self, action: str, batch_ids: list[str]) -> dict[str, str | Exception]:
+        """
+        Execute bulk operation action (start, stop, get, delete) for several batches concurrently
+        """
+        requests_data = {batch_id: {"batch_id": batch_id} for batch_id in batch_ids}
+        return self.do_concurrent_requests(controller='bulk_operation', action=action, requests_data=requests_data)
+
     def get_xpayments_web_location(self) -> str:
         """
         Get web location of the X-Payments Cloud instance